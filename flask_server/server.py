@@ -1,94 +1,143 @@
-from flask import Flask, render_template, jsonify, request
+# Patch the stdlib before anything else imports it so blocking calls yield to the gevent hub
+from gevent import monkey
+monkey.patch_all()
+
+from flask import Flask, render_template, request, Response
 from flask_socketio import SocketIO, emit
+from socketio import packet as sio_packet
+from engineio import packet as eio_packet
 import socket
-import json
+import struct
+import functools
 import logging
 import sys
 import os
+import hashlib
+import glob
+import copy
+import time
 import qrcode
+import orjson
 from datetime import datetime
+from decimal import Decimal
 from collections import deque
 
+from state_defaults import LATEST_STATE_DEFAULT
+
 # Disable all HTTP request logging
-logging.getLogger('werkzeug').setLevel(logging.CRITICAL)
+werkzeug_logger = logging.getLogger('werkzeug')
+werkzeug_logger.handlers = [logging.NullHandler()]
+werkzeug_logger.propagate = False
 logging.getLogger('socketio').setLevel(logging.CRITICAL)
 logging.getLogger('engineio').setLevel(logging.CRITICAL)
-logging.getLogger('eventlet').setLevel(logging.CRITICAL)
-logging.getLogger('eventlet.wsgi').setLevel(logging.CRITICAL)
-
-# Suppress WSGI server messages by filtering stdout and stderr
-class FilteredStream:
-    def __init__(self, original_stream):
-        self.original_stream = original_stream
-        self.skip_patterns = [
-            'wsgi starting up',
-            'wsgi starting',
-            'accepted (',
-            'GET /socket.io',
-            'POST /socket.io',
-            'GET /static',
-            'GET / HTTP',
-            ' - - [',
-            ') wsgi',
-            ') accepted'
-        ]
-    
-    def write(self, text):
-        # Skip lines that match any of our patterns
-        if text and not any(pattern in text for pattern in self.skip_patterns):
-            self.original_stream.write(text)
-    
-    def flush(self):
-        self.original_stream.flush()
-    
-    def __getattr__(self, name):
-        return getattr(self.original_stream, name)
 
-# Apply filtering to both stdout and stderr
-sys.stdout = FilteredStream(sys.stdout)
-sys.stderr = FilteredStream(sys.stderr)
+class OrjsonCodec:
+    """Drop-in for the json module that python-socketio uses to encode and decode packets."""
+
+    @staticmethod
+    def dumps(obj, **kwargs):
+        # orjson output is always compact, so separators and friends are ignored
+        return orjson.dumps(obj).decode()
+
+    @staticmethod
+    def loads(s, **kwargs):
+        return orjson.loads(s)
 
 app = Flask(__name__)
 app.config["SECRET_KEY"] = "woz-dev"
-socketio = SocketIO(app, cors_allowed_origins="*", max_http_buffer_size=20 * 1024 * 1024, logger=False, engineio_logger=False)
+# Old clients expect one "user:module_event" frame per interaction
+app.config["LEGACY_MODULE_EVENTS"] = os.environ.get("LEGACY_MODULE_EVENTS") == "1"
+# Pretty-print module event payloads to the console (costly during drags)
+app.config["DEBUG_PAYLOADS"] = os.environ.get("DEBUG_PAYLOADS") == "1"
+socketio = SocketIO(app, async_mode="gevent", json=OrjsonCodec, cors_allowed_origins="*", max_http_buffer_size=20 * 1024 * 1024, logger=False, engineio_logger=False)
+
+# JSON message log: ring buffer holding the last JSON_MESSAGES_MAX messages
+JSON_MESSAGES_MAX = 100
+_LOG_BUF = [None] * JSON_MESSAGES_MAX
+_LOG_HEAD = 0  # slot the next message is written to
+_LOG_COUNT = 0
+
+# Log broadcasts waiting to be flushed as a single "json_messages_batch" frame
+LOG_FLUSH_INTERVAL = 0.05  # seconds
+LOG_BATCH_MAX = 140  # flush immediately once this many messages are pending
+_pending_logs = []
+_flush_scheduled = False
 
-# JSON message log (store last 100 messages)
-JSON_MESSAGES = deque(maxlen=100)
+# Module events waiting to be rebroadcast as a single "user:module_event_batch"
+MODULE_EVENT_FLUSH_INTERVAL = 0.03  # seconds
+_pending_events = []
+_pending_change_index = {}  # module id -> index of its "change" event in _pending_events
+_events_flush_scheduled = False
+
+# Wizard state changes are broadcast at most once per interval as a "state:patch"
+STATE_FLUSH_INTERVAL = 0.033  # seconds
+_pending_patch = {}  # JSON pointer path -> (patch op, sid that pushed it), in the order they must be applied
+_state_flush_scheduled = False
+_state_packets = None  # "state" packets encoding LATEST_STATE, cleared whenever the state changes
+
+# Broadcasts yield to other greenlets after queueing a packet for this many clients
+BROADCAST_BATCH_SIZE = 50
 
 # Store player info per session (sid -> player name)
 player_registry = {}
 
+# Connected client count, kept up to date by connect/disconnect
+_client_count = 0
+
+# Timestamps are formatted at most once per interval and shared by every event in it
+TIMESTAMP_RESOLUTION = 0.05  # seconds
+_now_iso_cached = ""
+_now_iso_at = 0.0
+
+def now_iso():
+    """Return the current local time as an ISO 8601 string, cached for TIMESTAMP_RESOLUTION."""
+    global _now_iso_cached, _now_iso_at
+    now = time.time()
+    if now - _now_iso_at >= TIMESTAMP_RESOLUTION:
+        _now_iso_cached = datetime.fromtimestamp(now).isoformat()
+        _now_iso_at = now
+    return _now_iso_cached
+
+# Console lines from hot handlers, written out in batches by a background task
+CONSOLE_FLUSH_INTERVAL = 0.1  # seconds
+_console_lines = deque(maxlen=4096)  # oldest lines are dropped if the writer falls behind
+_console_flush_scheduled = False
+
+def console_log(line):
+    """Queue a line for the console instead of blocking the handler on stdout."""
+    global _console_flush_scheduled
+    _console_lines.append(line)
+    if not _console_flush_scheduled:
+        _console_flush_scheduled = True
+        socketio.start_background_task(_flush_console)
+
+def _flush_console():
+    """Write every queued console line with a single write."""
+    global _console_flush_scheduled
+    socketio.sleep(CONSOLE_FLUSH_INTERVAL)
+    _console_flush_scheduled = False
+    lines = []
+    while _console_lines:
+        lines.append(_console_lines.popleft())
+    if lines:
+        sys.__stdout__.write("\n".join(lines) + "\n")
+        sys.__stdout__.flush()
+
 # --- Canonical schema: single global surface state ---
-LATEST_STATE = {
-    "v": 1,
-    "surface": {
-        "cols": 4,
-        "rows": 6,
-        "theme": {
-            "bg": "#0a0a0d",
-            "fg": "#e8e8ee",
-            "muted": "#8d8d98",
-            "accent": "#b7c7ff",  # single accent
-            "glow": 0.9,         # 0..1
-            "grain": 0.12,       # 0..1
-        },
-        "tempo": 0.35,  # 0..1 (affects indicator breathing)
-    },
-    "modules": [
-        # id uses grid coordinates
-        # type: "trig" | "fader" | "dial" | "meter"
-        {"id": "A1", "type": "trig", "label": "∎", "mode": "momentary", "value": 0, "locked": False},
-        {"id": "A2", "type": "fader", "label": "I", "min": 0, "max": 1, "step": 0.01, "value": 0.62, "locked": False},
-        {"id": "A3", "type": "dial", "label": "↺", "min": 0, "max": 1, "step": 0.02, "value": 0.18, "locked": False},
-        {"id": "A4", "type": "meter", "label": "⋯", "value": 0.4},
-
-        {"id": "B1", "type": "trig", "label": "—", "mode": "toggle", "value": 1, "locked": False},
-        {"id": "B2", "type": "meter", "label": "⌁", "value": 0.2},
-        {"id": "B3", "type": "fader", "label": "II", "min": 0, "max": 1, "step": 0.01, "value": 0.28, "locked": False},
-        {"id": "B4", "type": "dial", "label": "⅓", "min": 0, "max": 1, "step": 0.02, "value": 0.76, "locked": False},
-        # You can fill C..F rows similarly; renderer tolerates missing cells.
-    ],
-}
+# Deep-copied so runtime changes never leak back into the shared defaults
+LATEST_STATE = copy.deepcopy(LATEST_STATE_DEFAULT)
+
+def _build_module_index(modules):
+    """Map module id -> (position, the module dict itself); first occurrence wins."""
+    index = {}
+    if isinstance(modules, list):
+        for i, m in enumerate(modules):
+            if isinstance(m, dict):
+                index.setdefault(m.get("id"), (i, m))
+    return index
+
+# Rebuilt whenever the wizard replaces "modules"; dicts are the live ones in LATEST_STATE
+_modules_by_id = _build_module_index(LATEST_STATE["modules"])
 
 @app.route("/")
 def index():
@@ -96,18 +145,13 @@ def index():
 
 @socketio.on("connect")
 def on_connect():
+    global _client_count
     # Register player with default name
-    player_registry[request.sid] = {"playerName": "Player", "connectedAt": datetime.now().isoformat()}
+    player_registry[request.sid] = {"playerName": "Player", "connectedAt": now_iso()}
     
-    # Count total connected clients
-    try:
-        # Get all connected clients from the namespace
-        namespace = '/'
-        total_clients = len(socketio.server.manager.get_participants(namespace, namespace))
-    except:
-        total_clients = 1  # Fallback if we can't count
-    print(f"Interface client connected: {request.sid} (Total: {total_clients})")
-    emit("state", LATEST_STATE)
+    _client_count += 1
+    print(f"Interface client connected: {request.sid} (Total: {_client_count})")
+    _send_packets(request.sid, _state_snapshot_packets())
 
 @socketio.on("wizard:push_state")
 def wizard_push_state(data):
@@ -115,8 +159,11 @@ def wizard_push_state(data):
     Wizard pushes partial or full state:
       { state: {...} }
     We shallow-merge top-level keys; for modules we replace array if provided.
+    Clients receive only what changed, as JSON Patch ops on "state:patch"; a
+    pusher isn't sent its own ops back since it already merged them locally.
+    The full state is sent once on connect.
     """
-    global LATEST_STATE
+    global LATEST_STATE, _state_packets, _modules_by_id
     state = (data or {}).get("state")
     if not isinstance(state, dict):
         return
@@ -125,9 +172,24 @@ def wizard_push_state(data):
     log_json_message({
         "type": "wizard:push_state",
         "state": state,
-        "timestamp": datetime.now().isoformat()
+        "timestamp": now_iso()
     })
 
+    # Diff against the stored state before merging so only changes go out
+    ops = []
+    for k, v in state.items():
+        path = "/" + _pointer_token(k)
+        current = LATEST_STATE.get(k)
+        if k not in LATEST_STATE:
+            ops.append({"op": "add", "path": path, "value": v})
+        elif k == "surface" and isinstance(v, dict) and isinstance(current, dict):
+            # surface is merged key by key, so only the keys sent can change
+            _diff_json(path, {sk: current[sk] for sk in v if sk in current}, v, ops)
+        else:
+            _diff_json(path, current, v, ops)
+    if not ops:
+        return
+
     # Merge: keep unspecified keys
     for k, v in state.items():
         if k == "modules" and isinstance(v, list):
@@ -136,8 +198,135 @@ def wizard_push_state(data):
             LATEST_STATE["surface"].update(v)
         else:
             LATEST_STATE[k] = v
+    if "modules" in state:
+        _modules_by_id = _build_module_index(LATEST_STATE["modules"])
+
+    _state_packets = None
+    for op in ops:
+        _queue_patch(op, request.sid)
+    _schedule_state_flush()
+
+def _schedule_state_flush():
+    """Make sure a state flush is pending for the ops just queued."""
+    global _state_flush_scheduled
+    if not _state_flush_scheduled:
+        _state_flush_scheduled = True
+        socketio.start_background_task(_flush_state)
+
+def _pointer_token(key):
+    """Escape a key for use as one JSON pointer segment."""
+    return str(key).replace("~", "~0").replace("/", "~1")
+
+def _diff_json(path, old, new, ops):
+    """Append JSON Patch ops to ops that turn old into new at path."""
+    if isinstance(old, dict) and isinstance(new, dict):
+        for k, v in new.items():
+            child = f"{path}/{_pointer_token(k)}"
+            if k in old:
+                _diff_json(child, old[k], v, ops)
+            else:
+                ops.append({"op": "add", "path": child, "value": v})
+        for k in old.keys() - new.keys():
+            ops.append({"op": "remove", "path": f"{path}/{_pointer_token(k)}"})
+    elif isinstance(old, list) and isinstance(new, list) and len(old) == len(new):
+        for i, (o, n) in enumerate(zip(old, new)):
+            _diff_json(f"{path}/{i}", o, n, ops)
+    elif type(old) is not type(new) or old != new:
+        ops.append({"op": "replace", "path": path, "value": new})
+
+def _queue_patch(op, sid):
+    """Queue a patch op pushed by sid (None for server-side changes), dropping queued ops it overwrites."""
+    path = op["path"]
+    prefix = path + "/"
+    for p in [p for p in _pending_patch if p == path or p.startswith(prefix)]:
+        del _pending_patch[p]
+    _pending_patch[path] = (op, sid)
+
+def _ops_for_pusher(entries, sid):
+    """
+    Ops a pusher still needs from a flush: everyone else's, plus any of its own
+    that an earlier op from another client at a parent path would otherwise
+    overwrite on its copy.
+    """
+    ops = []
+    other_paths = []
+    for op, pushed_by in entries:
+        if pushed_by != sid:
+            ops.append(op)
+            other_paths.append(op["path"])
+        elif any(op["path"].startswith(p + "/") for p in other_paths):
+            ops.append(op)
+    return ops
 
-    emit("state", LATEST_STATE, broadcast=True, include_self=False)
+def _flush_state():
+    """Broadcast the state changes queued during the last interval as one patch."""
+    global _state_flush_scheduled
+    socketio.sleep(STATE_FLUSH_INTERVAL)
+    _state_flush_scheduled = False
+    if not _pending_patch:
+        return
+    entries = list(_pending_patch.values())
+    _pending_patch.clear()
+    # Pushes from several wizards can share a flush: clients that didn't push get
+    # every op, and each pusher gets the ops it doesn't already have
+    pushers = {sid for _, sid in entries if sid is not None}
+    _chunked_broadcast(_encode_packets("state:patch", [op for op, _ in entries]), skip_sids=pushers)
+    for sid in pushers:
+        ops = _ops_for_pusher(entries, sid)
+        if ops:
+            _send_packets(sid, _encode_packets("state:patch", ops))
+
+def _state_snapshot_packets():
+    """Return the "state" packets for LATEST_STATE, encoding them only after a change."""
+    global _state_packets
+    if _state_packets is None:
+        _state_packets = _encode_packets("state", LATEST_STATE)
+    return _state_packets
+
+def _encode_packets(event, data):
+    """
+    Encode an event for the default namespace into engine.io packets that can be
+    sent to any client. This mirrors what manager.emit does internally for a
+    broadcast; doing it here lets the connect snapshot be cached and lets
+    _chunked_broadcast yield between clients. Sending relies on the private
+    Server._send_eio_packet, hence python-socketio>=5.9.0 in requirements.txt.
+    """
+    encoded = socketio.server.packet_class(sio_packet.EVENT, namespace="/", data=[event, data]).encode()
+    if not isinstance(encoded, list):
+        encoded = [encoded]
+    return [eio_packet.Packet(eio_packet.MESSAGE, p) for p in encoded]
+
+def _send_packets(sid, eio_pkts):
+    """Queue already-encoded packets for one client."""
+    eio_sid = socketio.server.manager.eio_sid_from_sid(sid, "/")
+    if eio_sid is None:
+        return  # disconnected since
+    for p in eio_pkts:
+        socketio.server._send_eio_packet(eio_sid, p)
+
+def _broadcast(event, data):
+    """Encode an event once and broadcast it to every client."""
+    _chunked_broadcast(_encode_packets(event, data))
+
+def _chunked_broadcast(eio_pkts, skip_sids=()):
+    """
+    Queue already-encoded packets for every client on the default namespace,
+    yielding after every BROADCAST_BATCH_SIZE clients so a large fan-out can't
+    starve other handlers.
+
+    Nothing is written to a socket here: each client's engine.io writer greenlet
+    drains its queue and sends every pending packet back to back. Nagle stays
+    enabled on those connections (neither gevent nor engine.io sets TCP_NODELAY),
+    so the kernel already coalesces the frames and there is nothing to cork.
+    """
+    server = socketio.server
+    participants = list(server.manager.get_participants("/", None))
+    for i, (sid, eio_sid) in enumerate(participants, 1):
+        if sid not in skip_sids:
+            for p in eio_pkts:
+                server._send_eio_packet(eio_sid, p)
+        if i % BROADCAST_BATCH_SIZE == 0:
+            socketio.sleep(0)
 
 @socketio.on("player:update_name")
 def player_update_name(data):
@@ -149,14 +338,14 @@ def player_update_name(data):
     if request.sid in player_registry:
         player_registry[request.sid]["playerName"] = new_name
     else:
-        player_registry[request.sid] = {"playerName": new_name, "connectedAt": datetime.now().isoformat()}
+        player_registry[request.sid] = {"playerName": new_name, "connectedAt": now_iso()}
     
-    print(f"Player name updated: {new_name} (session: {request.sid[:8]}...)")
+    console_log(f"Player name updated: {new_name} (session: {request.sid[:8]}...)")
     
     log_json_message({
         "type": "player:update_name",
         "player": new_name,
-        "timestamp": datetime.now().isoformat()
+        "timestamp": now_iso()
     })
 
 @socketio.on("player:button_press")
@@ -169,13 +358,13 @@ def player_button_press(data):
     player_name = data.get("player") or player_info.get("playerName", "Player")
     movement = data.get("movement", "unknown")
     
-    print(f"{player_name}: {movement}")
+    console_log(f"{player_name}: {movement}")
     
     log_json_message({
         "type": "player:button_press",
         "player": player_name,
         "movement": movement,
-        "timestamp": datetime.now().isoformat()
+        "timestamp": now_iso()
     })
     
     # Broadcast to all other clients
@@ -194,7 +383,7 @@ def player_interaction(data):
     interaction = data.get("interaction", "unknown")
     value = data.get("value")
     
-    print(f"[{player_name}] interacted with {controller} ({controller_id}): {interaction} = {value}")
+    console_log(f"[{player_name}] interacted with {controller} ({controller_id}): {interaction} = {value}")
     
     log_json_message({
         "type": "player:interaction",
@@ -203,7 +392,7 @@ def player_interaction(data):
         "controllerId": controller_id,
         "interaction": interaction,
         "value": value,
-        "timestamp": datetime.now().isoformat()
+        "timestamp": now_iso()
     })
     
     # Broadcast interaction to all other clients
@@ -217,9 +406,9 @@ def user_module_event(data):
     Now supports JSON payloads for programmable buttons.
     Legacy format - still supported.
     """
-    global LATEST_STATE
+    global LATEST_STATE, _state_packets
     if not isinstance(data, dict):
-        print(f"WARNING: Invalid user:module_event data (not a dict): {data}")
+        console_log(f"WARNING: Invalid user:module_event data (not a dict): {data}")
         return
     
     player_info = player_registry.get(request.sid, {"playerName": "Player"})
@@ -230,12 +419,17 @@ def user_module_event(data):
     etype = data.get("etype")  # "press" | "release" | "change" | "toggle"
     payload = data.get("payload")  # Optional JSON payload for programmable buttons
 
+    idx, module = _modules_by_id.get(mid, (None, None)) if isinstance(mid, str) else (None, None)
+    if module is not None:
+        value = _quantise(module, value)
+
     # Print to console for debugging
-    print(f"[{player_name}] Button Interaction: id={mid}, type={etype}, value={value}")
-    if payload:
-        print(f"   Payload: {json.dumps(payload, indent=2)}")
-    else:
-        print(f"   Payload: (none)")
+    console_log(f"[{player_name}] Button Interaction: id={mid}, type={etype}, value={value}")
+    if app.config["DEBUG_PAYLOADS"]:
+        if payload:
+            console_log(f"   Payload: {orjson.dumps(payload, option=orjson.OPT_INDENT_2).decode()}")
+        else:
+            console_log(f"   Payload: (none)")
 
     # Log JSON message
     log_json_message({
@@ -245,14 +439,20 @@ def user_module_event(data):
         "etype": etype,
         "value": value,
         "payload": payload,
-        "timestamp": datetime.now().isoformat()
+        "timestamp": now_iso()
     })
 
-    # Update module value if present
-    for m in LATEST_STATE.get("modules", []):
-        if m.get("id") == mid and "value" in m and value is not None:
-            m["value"] = value
-            break
+    # Update module value if present, and pass the change on to every client's
+    # copy of the state (the sender's too) so later wizard diffs stay in step
+    if module is not None and value is not None and "value" in module:
+        ops = []
+        _diff_json(f"/modules/{idx}/value", module["value"], value, ops)
+        if ops:
+            module["value"] = value
+            _state_packets = None
+            for op in ops:
+                _queue_patch(op, None)
+            _schedule_state_flush()
 
     # Broadcast event to everyone else (e.g., wizard debug)
     # Include payload if present
@@ -264,11 +464,59 @@ def user_module_event(data):
     if payload is not None:
         event_data["payload"] = payload
     
-    emit("user:module_event", event_data, broadcast=True, include_self=False)
+    if app.config["LEGACY_MODULE_EVENTS"]:
+        emit("user:module_event", event_data, broadcast=True, include_self=False)
+    else:
+        queue_module_event(event_data)
+
+def _quantise(module, value):
+    """
+    Round a float value to the decimal places of the module's step, so drag noise
+    like 0.6200000000000001 is stored and sent as 0.62.
+    """
+    step = module.get("step")
+    if not isinstance(value, float) or isinstance(step, bool) or not isinstance(step, (int, float)) or step <= 0:
+        return value
+    places = -Decimal(str(step)).as_tuple().exponent
+    return round(value, max(places, 0))
+
+def queue_module_event(event_data):
+    """Queue a module event for the next batched rebroadcast."""
+    global _events_flush_scheduled
+    mid = event_data["id"]
+    if not isinstance(mid, str):
+        # Only string ids can be merged; anything else is passed through as sent
+        _pending_events.append(event_data)
+    elif event_data["etype"] != "change":
+        # Discrete presses and toggles are kept in full, in order
+        _pending_change_index.pop(mid, None)
+        _pending_events.append(event_data)
+    elif mid in _pending_change_index:
+        # Continuous controls only need their latest value
+        _pending_events[_pending_change_index[mid]] = event_data
+    else:
+        _pending_change_index[mid] = len(_pending_events)
+        _pending_events.append(event_data)
+    if not _events_flush_scheduled:
+        _events_flush_scheduled = True
+        socketio.start_background_task(_flush_module_events)
+
+def _flush_module_events():
+    """Wait for the batch window to close, then rebroadcast the queued events."""
+    global _pending_events, _events_flush_scheduled
+    socketio.sleep(MODULE_EVENT_FLUSH_INTERVAL)
+    _events_flush_scheduled = False
+    batch, _pending_events = _pending_events, []
+    _pending_change_index.clear()
+    if batch:
+        # Batches mix events from several senders, so they go to everyone
+        _broadcast("user:module_event_batch", batch)
 
 @socketio.on("disconnect")
 def on_disconnect():
     """Handle client disconnection and clean up player registry."""
+    global _client_count
+    _client_count -= 1
     if request.sid in player_registry:
         player_name = player_registry[request.sid].get("playerName", "Player")
         print(f"Player \"{player_name}\" disconnected (session: {request.sid[:8]}...)")
@@ -277,34 +525,111 @@ def on_disconnect():
         print(f"Interface client disconnected (session: {request.sid[:8]}...)")
 
 def log_json_message(message):
-    """Log a JSON message to the message queue."""
-    JSON_MESSAGES.append(message)
-    # Broadcast to all connected clients (emitting without a room broadcasts by default)
-    socketio.emit("json_message", message)
+    """Log a JSON message to the message queue and schedule its broadcast."""
+    global _flush_scheduled, _LOG_HEAD, _LOG_COUNT
+    _LOG_BUF[_LOG_HEAD] = message
+    _LOG_HEAD = (_LOG_HEAD + 1) % JSON_MESSAGES_MAX
+    _LOG_COUNT = min(_LOG_COUNT + 1, JSON_MESSAGES_MAX)
+    _pending_logs.append(message)
+    if len(_pending_logs) >= LOG_BATCH_MAX:
+        _emit_log_batch()
+    elif not _flush_scheduled:
+        _flush_scheduled = True
+        socketio.start_background_task(_flush_logs)
+
+def _flush_logs():
+    """Wait for the batch window to close, then broadcast what accumulated."""
+    global _flush_scheduled
+    socketio.sleep(LOG_FLUSH_INTERVAL)
+    _flush_scheduled = False
+    _emit_log_batch()
+
+def _emit_log_batch():
+    """Broadcast all pending log messages as one frame."""
+    global _pending_logs
+    if not _pending_logs:
+        return
+    batch, _pending_logs = _pending_logs, []
+    # Emitting without a room broadcasts to all connected clients
+    _broadcast("json_messages_batch", batch)
 
 @app.route("/api/json-messages")
 def get_json_messages():
-    """Get all logged JSON messages."""
-    return jsonify(list(JSON_MESSAGES))
+    """Get all logged JSON messages, oldest first."""
+    if _LOG_COUNT < JSON_MESSAGES_MAX:
+        snapshot = _LOG_BUF[:_LOG_COUNT]
+    else:
+        snapshot = _LOG_BUF[_LOG_HEAD:] + _LOG_BUF[:_LOG_HEAD]
+    return Response(orjson.dumps(snapshot), mimetype="application/json")
 
+@functools.lru_cache(maxsize=1)
 def get_local_ip():
-    """Get the local IP address of this machine."""
+    """Get the local IP address of this machine (looked up once per process)."""
+    return _route_ip() or _interface_ip() or _hostname_ip() or '127.0.0.1'
+
+def _route_ip():
+    """Address of the interface the default route goes out of, if there is one."""
+    # Connecting a UDP socket only asks the kernel for a route; nothing is sent
     try:
-        # Connect to a remote address to determine local IP
-        # This doesn't actually send data, just determines the route
-        s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        s.settimeout(0)
-        try:
-            # Try to connect to a non-routable address
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
             s.connect(('10.254.254.254', 1))
             ip = s.getsockname()[0]
-        except Exception:
-            ip = '127.0.0.1'
-        finally:
-            s.close()
-        return ip
-    except Exception:
-        return '127.0.0.1'
+    except OSError:
+        return None
+    return None if ip.startswith('127.') or ip == '0.0.0.0' else ip
+
+def _interface_ip():
+    """First IPv4 address on a non-loopback interface, read straight from the kernel (Linux only)."""
+    if not sys.platform.startswith('linux'):
+        return None
+    import fcntl
+    SIOCGIFADDR = 0x8915
+    try:
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+            for _, name in socket.if_nameindex():
+                try:
+                    ifreq = fcntl.ioctl(s.fileno(), SIOCGIFADDR, struct.pack('256s', name.encode()[:15]))
+                except OSError:
+                    continue  # interface has no IPv4 address
+                ip = socket.inet_ntoa(ifreq[20:24])
+                if not ip.startswith('127.'):
+                    return ip
+    except OSError:
+        return None
+    return None
+
+def _hostname_ip():
+    """First non-loopback IPv4 address the hostname resolves to."""
+    try:
+        infos = socket.getaddrinfo(socket.gethostname(), None, socket.AF_INET)
+    except OSError:
+        return None
+    for info in infos:
+        ip = info[4][0]
+        if not ip.startswith('127.'):
+            return ip
+    return None
+
+def save_qr_code(qr, url, name):
+    """
+    Save a QR code for url as <name>_<hash of url>.png next to this file.
+    The file is only generated when it doesn't exist yet, replacing any older
+    <name>_*.png; returns its name and whether it was generated.
+    """
+    digest = hashlib.blake2b(url.encode(), digest_size=8).hexdigest()
+    filename = f"{name}_{digest}.png"
+    directory = os.path.dirname(__file__)
+    path = os.path.join(directory, filename)
+    if os.path.exists(path):
+        return filename, False
+    for stale in glob.glob(os.path.join(glob.escape(directory), f"{name}_*.png")):
+        os.remove(stale)
+    qr.clear()
+    qr.version = 1  # let fit=True pick the smallest version for this url
+    qr.add_data(url)
+    qr.make(fit=True)
+    qr.make_image(fill_color="black", back_color="white").save(path)
+    return filename, True
 
 if __name__ == "__main__":
     port = 5001
@@ -318,25 +643,17 @@ if __name__ == "__main__":
                   f"Local access:    {local_url}\n" + \
                   f"Network access:  {network_url}\n" + \
                   "="*60 + "\n"
-    # Write directly to original stdout to avoid filtering
+    # Write straight to the process stdout
     sys.__stdout__.write(startup_msg)
     sys.__stdout__.flush()
     
-    # Generate QR codes
+    # Generate QR codes (reused across restarts while the URLs stay the same)
     try:
-        qr_local = qrcode.QRCode(version=1, box_size=10, border=4)
-        qr_local.add_data(local_url)
-        qr_local.make(fit=True)
-        img_local = qr_local.make_image(fill_color="black", back_color="white")
-        img_local.save(os.path.join(os.path.dirname(__file__), "access_qr_local.png"))
-        sys.__stdout__.write(f"QR code generated: access_qr_local.png ({local_url})\n")
-        
-        qr_network = qrcode.QRCode(version=1, box_size=10, border=4)
-        qr_network.add_data(network_url)
-        qr_network.make(fit=True)
-        img_network = qr_network.make_image(fill_color="black", back_color="white")
-        img_network.save(os.path.join(os.path.dirname(__file__), "access_qr_network.png"))
-        sys.__stdout__.write(f"QR code generated: access_qr_network.png ({network_url})\n")
+        qr = qrcode.QRCode(version=1, box_size=10, border=4)
+        for name, url in (("access_qr_local", local_url), ("access_qr_network", network_url)):
+            filename, generated = save_qr_code(qr, url, name)
+            status = "generated" if generated else "reused"
+            sys.__stdout__.write(f"QR code {status}: {filename} ({url})\n")
         sys.__stdout__.flush()
     except Exception as e:
         sys.__stdout__.write(f"Warning: Could not generate QR codes: {e}\n")
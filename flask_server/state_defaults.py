@@ -0,0 +1,33 @@
+"""Default surface state; anything that needs a fresh state deep-copies LATEST_STATE_DEFAULT."""
+
+# --- Canonical schema: single global surface state ---
+LATEST_STATE_DEFAULT = {
+    "v": 1,
+    "surface": {
+        "cols": 4,
+        "rows": 6,
+        "theme": {
+            "bg": "#0a0a0d",
+            "fg": "#e8e8ee",
+            "muted": "#8d8d98",
+            "accent": "#b7c7ff",  # single accent
+            "glow": 0.9,         # 0..1
+            "grain": 0.12,       # 0..1
+        },
+        "tempo": 0.35,  # 0..1 (affects indicator breathing)
+    },
+    "modules": [
+        # id uses grid coordinates
+        # type: "trig" | "fader" | "dial" | "meter"
+        {"id": "A1", "type": "trig", "label": "∎", "mode": "momentary", "value": 0, "locked": False},
+        {"id": "A2", "type": "fader", "label": "I", "min": 0, "max": 1, "step": 0.01, "value": 0.62, "locked": False},
+        {"id": "A3", "type": "dial", "label": "↺", "min": 0, "max": 1, "step": 0.02, "value": 0.18, "locked": False},
+        {"id": "A4", "type": "meter", "label": "⋯", "value": 0.4},
+
+        {"id": "B1", "type": "trig", "label": "—", "mode": "toggle", "value": 1, "locked": False},
+        {"id": "B2", "type": "meter", "label": "⌁", "value": 0.2},
+        {"id": "B3", "type": "fader", "label": "II", "min": 0, "max": 1, "step": 0.01, "value": 0.28, "locked": False},
+        {"id": "B4", "type": "dial", "label": "⅓", "min": 0, "max": 1, "step": 0.02, "value": 0.76, "locked": False},
+        # You can fill C..F rows similarly; renderer tolerates missing cells.
+    ],
+}
@@ -675,14 +675,95 @@ const stateManager = new StateManager(socket);
 const eventManager = new EventManager(socket);
 const moduleManager = new ModuleManager(stateManager, eventManager);
 
-socket.on("state", (s) => {
+// Last state exactly as the server holds it, so "state:patch" paths line up.
+// The server doesn't echo our own pushes, so autoPushState merges them in here.
+let serverState = null;
+
+/**
+ * Merge a pushed state into serverState the way the server merges it
+ * @param {Object} pushed - State sent with "wizard:push_state"
+ */
+function mergePushedState(pushed) {
+  if (!serverState) return;
+  const copy = JSON.parse(JSON.stringify(pushed));
+  Object.entries(copy).forEach(([k, v]) => {
+    if (k === "modules" && Array.isArray(v)) {
+      serverState.modules = v;
+    } else if (k === "surface" && v && typeof v === "object" && !Array.isArray(v)) {
+      serverState.surface = Object.assign(serverState.surface || {}, v);
+    } else {
+      serverState[k] = v;
+    }
+  });
+}
+
+/**
+ * Apply JSON Patch style ops ("add" / "replace" / "remove") in place
+ * @param {Object} target - State object to patch
+ * @param {Array} ops - Ops with JSON pointer paths
+ */
+function applyStatePatch(target, ops) {
+  ops.forEach(({ op, path, value }) => {
+    const keys = path.split("/").slice(1).map((k) => k.replace(/~1/g, "/").replace(/~0/g, "~"));
+    const last = keys.pop();
+    let parent = target;
+    for (const k of keys) {
+      if (parent == null) return;
+      parent = parent[k];
+    }
+    if (parent == null || typeof parent !== "object") return;
+    if (op === "remove") {
+      if (Array.isArray(parent)) parent.splice(Number(last), 1);
+      else delete parent[last];
+    } else {
+      parent[last] = value;
+    }
+  });
+}
+
+/**
+ * Take in a new state and re-render the views that depend on it
+ * @param {Object} s - State object
+ * @param {Set} [changed] - Top-level keys that changed; omitted for a full state
+ */
+function receiveState(s, changed = null) {
   // Update state through StateManager for proper validation
   stateManager.setState(s);
   state = stateManager.getState();
   window.state = state; // Make globally accessible
-  applyThemeFromState(state);
-  hydrateWizard(state);
-  renderSurface(state);
+  // Theme reads surface; wizard and surface views read surface + layout
+  const touched = (key) => !changed || changed.has(key);
+  if (touched("surface")) {
+    applyThemeFromState(state);
+  }
+  if (touched("surface") || touched("layout")) {
+    hydrateWizard(state);
+    renderSurface(state);
+  }
+}
+
+// Full state arrives once on connect
+socket.on("state", (s) => {
+  serverState = s;
+  receiveState(JSON.parse(JSON.stringify(serverState)));
+});
+
+// After that the server only sends what changed
+socket.on("state:patch", (ops) => {
+  if (!serverState) return;
+  applyStatePatch(serverState, ops);
+  const changed = new Set(ops.map((o) => o.path.split("/")[1]));
+  receiveState(JSON.parse(JSON.stringify(serverState)), changed);
+});
+
+// Server batches JSON log messages; dispatch each one as its own event
+socket.on("json_messages_batch", (batch) => {
+  (batch || []).forEach((message) => eventManager.emit("json_message", message));
+});
+
+// Module events from other players arrive batched (latest value per control)
+socket.on("user:module_event_batch", (batch) => {
+  (batch || []).forEach((event) => eventManager.emit("user:module_event", event));
 });
 
 // ---------- player name management ----------
@@ -2740,6 +2821,7 @@ function autoPushState() {
   state.surface.themeMode = $("themeMode").value;
   state.surface.accentPreset = $("accentPreset").value;
   socket.emit("wizard:push_state", { state });
+  mergePushedState(state);
 }
 
 // Auto-update grid when cols/rows change